@@ -1,21 +1,45 @@
 import os
 from dotenv import load_dotenv
+import groq
 from groq import Groq
 import logging
 import time
 import sys
 
-from config import LLM_MODEL, TEMPERATURE, MAX_TOKENS
-from prompts import get_classification_prompt, get_followup_prompt
+from config import (
+    LLM_MODEL,
+    LLM_MODEL_BIG,
+    TEMPERATURE,
+    CLASSIFY_TEMPERATURE,
+    MAX_TOKENS,
+    LLM_CONTEXT_TOKENS,
+    LLM_CACHE_ENABLED,
+)
+from prompts import (
+    SYSTEM_CLASSIFY,
+    SYSTEM_FOLLOWUP,
+    STRICT_JSON_SUFFIX,
+    get_classification_prompt,
+    get_followup_prompt,
+)
 from tools import (
     load_leads,
-    load_state,
+    get_state,
     update_lead_state,
+    flush_state,
     save_draft,
     parse_json_response,
+    is_json_object,
+    is_json_validate_failed,
     send_email,
     parse_email_content,
+    estimate_tokens,
+    fit_lead_message,
+    path_exists,
 )
+from llm_cache import make_key, get_cached, set_cached
+import semantic_cache
+from router import route_request, rule_based_classification
 
 # -----------------------------
 # Setup
@@ -59,26 +83,60 @@ class LeadQualificationAgent:
         self.temperature = TEMPERATURE
         self.max_tokens = MAX_TOKENS
 
-    def call_llm(self, prompt):
-        """Groq LLM call wrapper with retries"""
+    def call_llm(self, prompt, system="You are a helpful sales assistant.", model=None, temperature=None,
+                 response_format=None):
+        """Groq LLM call wrapper with retries and response cache"""
+        if model is None:
+            model = self.model
+        if temperature is None:
+            temperature = self.temperature
+
+        # Preflight: don't spend a round-trip on a request Groq will reject
+        if estimate_tokens(system) + estimate_tokens(prompt) + self.max_tokens > LLM_CONTEXT_TOKENS:
+            logger.error("LLM request exceeds the model context window - skipped")
+            return None
+
+        cache_key = make_key(model, temperature, self.max_tokens, prompt, system)
+        if LLM_CACHE_ENABLED:
+            cached = get_cached(cache_key)
+            if cached is not None:
+                logger.info("✓ LLM response served from cache")
+                return cached
+
+        request = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": temperature,
+            "max_tokens": self.max_tokens,
+        }
+        if response_format:
+            request["response_format"] = response_format
+
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                response = client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a helpful sales assistant."},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=self.temperature,
-                    max_tokens=self.max_tokens,
-                )
+                response = client.chat.completions.create(**request)
 
                 if not response or not response.choices:
                     raise ValueError("Empty response")
 
                 logger.info(f"✓ LLM response received (attempt {attempt+1})")
-                return response.choices[0].message.content
+                content = response.choices[0].message.content
+                # Never cache a JSON-mode reply that won't parse: it would be replayed every run
+                if LLM_CACHE_ENABLED and content and (not response_format or is_json_object(content)):
+                    set_cached(cache_key, content)
+                return content
+
+            except groq.BadRequestError as e:
+                if response_format and is_json_validate_failed(e):
+                    # JSON mode rejected the output: classify_lead retries with a stricter prompt
+                    logger.warning("⚠ LLM output failed JSON validation")
+                    raise
+                logger.error(f"LLM Error (attempt {attempt+1}/{max_retries}): {e}")
+                return None
 
             except Exception as e:
                 logger.error(f"LLM Error (attempt {attempt+1}/{max_retries}): {e}")
@@ -91,14 +149,42 @@ class LeadQualificationAgent:
     # -------------------------
 
     def classify_lead(self, lead):
+        lead = fit_lead_message(lead)
+        route = route_request(lead['message'])
+        if route == "rule_based":
+            logger.info("✓ Lead classified by rules (no LLM call)")
+            return rule_based_classification()
+
+        cached = semantic_cache.lookup(lead['message'])
+        if cached:
+            logger.info(f"✓ Lead classified from semantic cache: {cached.get('category', 'Unknown')}")
+            return cached
+
+        # Heavy / long messages get the bigger model
+        model = LLM_MODEL_BIG if route == "big_model" else self.model
         prompt = get_classification_prompt(lead)
-        response = self.call_llm(prompt)
 
-        if response:
+        # JSON mode validates the output; retry once with a stricter instruction
+        for system in (SYSTEM_CLASSIFY, SYSTEM_CLASSIFY + STRICT_JSON_SUFFIX):
+            try:
+                response = self.call_llm(
+                    prompt,
+                    system=system,
+                    model=model,
+                    temperature=CLASSIFY_TEMPERATURE,
+                    response_format={"type": "json_object"},
+                )
+            except groq.BadRequestError:
+                continue  # json_validate_failed: try the stricter instruction
+            if not response:
+                break
+
             classification = parse_json_response(response)
-            if classification:
+            if isinstance(classification, dict):
                 logger.info(f"✓ Lead classified: {classification.get('category', 'Unknown')}")
+                semantic_cache.store(lead['message'], classification)
                 return classification
+            logger.warning("⚠ LLM reply was not valid JSON")
 
         # fallback
         logger.warning("⚠ Using fallback classification")
@@ -114,8 +200,9 @@ class LeadQualificationAgent:
     # -------------------------
 
     def generate_followup(self, lead, classification):
+        lead = fit_lead_message(lead)
         prompt = get_followup_prompt(lead, classification)
-        response = self.call_llm(prompt)
+        response = self.call_llm(prompt, system=SYSTEM_FOLLOWUP)
         return response if response else "Error: Could not generate email"
 
     # -------------------------
@@ -209,21 +296,23 @@ def validate_setup():
     if not os.getenv("GROQ_API_KEY"):
         issues.append("❌ GROQ_API_KEY not found in .env")
     
-    if not os.path.exists('data/leads.csv'):
+    if not path_exists('data/leads.csv'):
         issues.append("❌ data/leads.csv missing")
     
     # Check email config (warning only)
-    if not os.getenv("EMAIL_SENDER") or not os.getenv("EMAIL_PASSWORD"):
-        print("⚠️  Warning: Email not configured (EMAIL_SENDER/EMAIL_PASSWORD missing)")
+    if not os.getenv("RESEND_API_KEY"):
+        print("⚠️  Warning: Email not configured (RESEND_API_KEY missing)")
         print("   You can still save drafts, but cannot send emails automatically.")
-        print("   See EMAIL_SETUP.md for configuration instructions.\n")
+        print("   See EMAIL_SETUP.MD for configuration instructions.\n")
     
-    if not os.path.exists('outputs'):
+    if not path_exists('outputs'):
         os.makedirs('outputs/drafts', exist_ok=True)
+        path_exists.cache_clear()
         logger.info("✓ Created outputs directory")
     
-    if not os.path.exists('data'):
+    if not path_exists('data'):
         os.makedirs('data', exist_ok=True)
+        path_exists.cache_clear()
         logger.info("✓ Created data directory")
     
     if issues:
@@ -247,17 +336,16 @@ def main():
     agent = LeadQualificationAgent()
 
     leads = load_leads()
-    if leads.empty:
+    if not leads:
         print("✗ No leads found.")
         logger.warning("No leads found in leads.csv")
         return
 
-    state = load_state()
-    processed_ids = set(state["lead_id"].values) if not state.empty else set()
+    processed_ids = get_state()  # dict keyed by lead_id: O(1) membership, no set copy
 
-    new_leads = leads[~leads["lead_id"].isin(processed_ids)]
+    new_leads = [lead for lead in leads if lead["lead_id"] not in processed_ids]
 
-    if new_leads.empty:
+    if not new_leads:
         print("✓ All leads already processed!")
         logger.info("All leads already processed")
         return
@@ -265,7 +353,7 @@ def main():
     print(f"Found {len(new_leads)} new leads.\n")
     logger.info(f"Processing {len(new_leads)} new leads")
 
-    for idx, lead in new_leads.iterrows():
+    for lead in new_leads:
         try:
             result = agent.process_lead(lead)
 
@@ -315,6 +403,8 @@ def main():
             logger.error(f"Error processing lead {lead['lead_id']}: {e}", exc_info=True)
             print(f"\n✗ Error processing lead {lead['lead_id']}: {e}\n")
 
+    flush_state()
+
     print("\n" + "=" * 70)
     print("✅ PROCESSING COMPLETE!")
     print("=" * 70 + "\n")
@@ -1,21 +1,59 @@
 import os
+import asyncio
+from datetime import datetime
 from dotenv import load_dotenv
-from groq import Groq
+import importlib.util
+import httpx
+import groq
+from groq import AsyncGroq, DefaultAsyncHttpxClient
 import logging
-import time
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import atexit
+import signal
 import sys
-import schedule
-from config import LLM_MODEL, TEMPERATURE, MAX_TOKENS
-from prompts import get_classification_prompt, get_followup_prompt
+from config import (
+    LLM_MODEL,
+    LLM_MODEL_BIG,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE,
+    LLM_TIMEOUT,
+    LLM_CONNECT_TIMEOUT,
+    TEMPERATURE,
+    CLASSIFY_TEMPERATURE,
+    MAX_TOKENS,
+    LLM_CONTEXT_TOKENS,
+    LLM_CACHE_ENABLED,
+    CLASSIFY_BATCH_SIZE,
+    BATCH_TOKENS_PER_LEAD,
+)
+from prompts import (
+    SYSTEM_CLASSIFY,
+    SYSTEM_BATCH_CLASSIFY,
+    SYSTEM_FOLLOWUP,
+    STRICT_JSON_SUFFIX,
+    get_classification_prompt,
+    get_followup_prompt,
+    get_batch_classification_prompt,
+)
 from tools import (
     load_leads,
-    load_state,
+    get_state,
     update_lead_state,
-    save_draft,
+    flush_state,
+    save_drafts,
     parse_json_response,
-    send_email,
+    is_json_object,
+    is_json_validate_failed,
+    send_emails_bulk,
     parse_email_content,
+    estimate_tokens,
+    fit_lead_message,
 )
+from llm_cache import make_key, get_cached, set_cached
+import semantic_cache
+from router import route_request, rule_based_classification
+from rate_limiter import RateLimiter, retry_after_seconds
 
 # ----------------------------- 
 # Setup
@@ -29,14 +67,23 @@ else:
     logger_msg = "No .env file - using system environment variables"
 
 # Logging Configuration with UTF-8 support
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('outputs/agent.log', encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Callers only enqueue records; file/console I/O runs on the listener thread
+log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+log_handlers = [
+    logging.FileHandler('outputs/agent.log', encoding='utf-8'),
+    logging.StreamHandler(sys.stdout)
+]
+for handler in log_handlers:
+    handler.setFormatter(log_formatter)
+
+log_queue = queue.Queue(-1)
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+
+log_listener = QueueListener(log_queue, *log_handlers)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 # Force UTF-8 for Windows console
 if sys.platform == 'win32':
@@ -52,16 +99,62 @@ API_KEY = os.getenv("GROQ_API_KEY")
 if not API_KEY:
     raise RuntimeError("GROQ_API_KEY not found in environment variables. Please set it in Railway.")
 
-client = Groq(api_key=API_KEY)
-
 # Auto-send configuration
 AUTO_SEND_EMAILS = os.getenv("AUTO_SEND_EMAILS", "false").lower() == "true"
 AUTO_APPROVE_THRESHOLD = os.getenv("AUTO_APPROVE_THRESHOLD", "Hot")  # Hot, Warm, Cold
+# With auto-send on: draft every lead, or only those that will actually be sent
+DRAFT_ALL = os.getenv("DRAFT_ALL", "false").lower() == "true"
+# Draft in parallel with single-lead classification using a neutral guess
+SPECULATIVE_DRAFTS = os.getenv("SPECULATIVE_DRAFTS", "true").lower() == "true"
+SPECULATIVE_CLASSIFICATION = {"category": "Warm", "intent": "unknown", "urgency": "unknown"}
 
 # Human-in-loop configuration
 EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "2"))  # Stop after 2 emails
 emails_sent_in_session = 0
 
+# Scheduled mode: seconds between processing runs
+SCHEDULE_INTERVAL = int(os.getenv("SCHEDULE_INTERVAL", "3600"))
+
+# Concurrency: max in-flight Groq requests (keep under your RPM headroom)
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+
+# HTTP/2 multiplexes concurrent requests over one TLS connection (needs the h2 package)
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def make_groq_client():
+    """AsyncGroq with a pre-sized connection pool; SDK retries off (call_llm retries)"""
+    http_client = DefaultAsyncHttpxClient(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+    )
+    return AsyncGroq(api_key=API_KEY, http_client=http_client, max_retries=0)
+
+def category_passes(category, threshold=AUTO_APPROVE_THRESHOLD):
+    """True if a lead of this category meets the auto-send threshold"""
+    if threshold == "Hot":
+        return category == "Hot"
+    elif threshold == "Warm":
+        return category in ["Hot", "Warm"]
+    elif threshold == "Cold":
+        return True
+    return False
+
+
+def should_draft(category):
+    """
+    Drafting is the larger LLM call - with auto-send on, skip it for leads that
+    will never be sent. Without auto-send, drafts are the output: draft all.
+    """
+    if DRAFT_ALL or not AUTO_SEND_EMAILS:
+        return True
+    return category_passes(category)
+
+
 # ----------------------------- 
 # Agent
 # ----------------------------- 
@@ -72,45 +165,164 @@ class LeadQualificationAgent:
         self.model = LLM_MODEL
         self.temperature = TEMPERATURE
         self.max_tokens = MAX_TOKENS
+        # Client lives on the agent: its connection pool is bound to the
+        # event loop of the asyncio.run() that the agent is used in
+        self.client = make_groq_client()
+        self.semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+        self.rate_limiter = RateLimiter()
+        self.speculation = {"hits": 0, "misses": 0}
     
-    def call_llm(self, prompt):
-        """Groq LLM call wrapper with retries"""
+    async def call_llm(self, prompt, system="You are a helpful sales assistant.", model=None,
+                       temperature=None, max_tokens=None, response_format=None):
+        """
+        Groq LLM call wrapper with retries and response cache (bounded by LLM_CONCURRENCY).
+        Plain-text replies are streamed; JSON-mode replies (response_format) are not,
+        since Groq JSON mode does not support streaming.
+        """
+        if model is None:
+            model = self.model
+        if temperature is None:
+            temperature = self.temperature
+        if max_tokens is None:
+            max_tokens = self.max_tokens
+        
+        # Preflight: don't spend a round-trip on a request Groq will reject
+        if estimate_tokens(system) + estimate_tokens(prompt) + max_tokens > LLM_CONTEXT_TOKENS:
+            logger.error("LLM request exceeds the model context window - skipped")
+            return None
+        
+        cache_key = make_key(model, temperature, max_tokens, prompt, system)
+        if LLM_CACHE_ENABLED:
+            cached = get_cached(cache_key)
+            if cached is not None:
+                logger.info("✓ LLM response served from cache")
+                return cached
+        
+        request = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if response_format:
+            request["response_format"] = response_format
+        else:
+            request["stream"] = True
+        
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                response = client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": "You are a helpful sales assistant."},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=self.temperature,
-                    max_tokens=self.max_tokens,
-                )
+                parts = []
+                async with self.semaphore:
+                    await self.rate_limiter.acquire()
+                    raw = await self.client.chat.completions.with_raw_response.create(**request)
+                    self.rate_limiter.update(raw.headers)
+                    
+                    if response_format:
+                        response = await raw.parse()
+                        if response and response.choices:
+                            parts.append(response.choices[0].message.content or "")
+                    else:
+                        stream = await raw.parse()
+                        async with stream:
+                            async for chunk in stream:
+                                if chunk.choices:
+                                    parts.append(chunk.choices[0].delta.content or "")
                 
-                if not response or not response.choices:
+                content = "".join(parts)
+                if not content:
                     raise ValueError("Empty response")
                 
-                logger.info(f"✓ LLM response received (attempt {attempt+1})")
-                return response.choices[0].message.content
+                logger.debug("✓ LLM response received (attempt %d)", attempt + 1)
+                # Never cache a JSON-mode reply that won't parse: it would be replayed every run
+                if LLM_CACHE_ENABLED and (not response_format or is_json_object(content)):
+                    set_cached(cache_key, content)
+                return content
+            
+            except groq.RateLimitError as e:
+                # 429: sleep exactly as long as Groq asks, for every caller
+                wait = retry_after_seconds(e.response.headers)
+                if wait is None:
+                    wait = 2 ** attempt
+                if attempt == max_retries - 1:
+                    logger.error(f"Rate limited (attempt {attempt+1}/{max_retries}), giving up")
+                    return None
+                logger.warning(f"Rate limited (attempt {attempt+1}/{max_retries}), retrying in {wait:.1f}s")
+                self.rate_limiter.block_for(wait)
+            
+            except groq.BadRequestError as e:
+                if response_format and is_json_validate_failed(e):
+                    # JSON mode rejected the output: call_llm_json retries with a stricter prompt
+                    logger.warning("⚠ LLM output failed JSON validation")
+                    raise
+                logger.error(f"LLM Error (attempt {attempt+1}/{max_retries}): {e}")
+                return None
+            
+            except groq.APIStatusError as e:
+                # Bad request / auth errors won't succeed on retry; server errors might
+                logger.error(f"LLM Error (attempt {attempt+1}/{max_retries}): {e}")
+                if e.status_code < 500 or attempt == max_retries - 1:
+                    return None
+                await asyncio.sleep(2 ** attempt)
             
             except Exception as e:
+                # Connection errors, timeouts, empty responses: exponential backoff
                 logger.error(f"LLM Error (attempt {attempt+1}/{max_retries}): {e}")
                 if attempt == max_retries - 1:
                     return None
-                time.sleep(2 ** attempt)
+                await asyncio.sleep(2 ** attempt)
         
         return None
     
-    def classify_lead(self, lead):
+    async def call_llm_json(self, prompt, system, **kwargs):
+        """JSON-mode LLM call; retries once with a stricter instruction if the reply is rejected or won't parse"""
+        for system_message in (system, system + STRICT_JSON_SUFFIX):
+            try:
+                response = await self.call_llm(
+                    prompt,
+                    system=system_message,
+                    response_format={"type": "json_object"},
+                    **kwargs,
+                )
+            except groq.BadRequestError:
+                continue  # json_validate_failed: try the stricter instruction
+            if not response:
+                return None
+            parsed = parse_json_response(response)
+            if isinstance(parsed, dict):
+                return parsed
+            logger.warning("⚠ LLM reply was not valid JSON")
+        return None
+    
+    async def classify_lead(self, lead):
+        lead = fit_lead_message(lead)
+        route = route_request(lead['message'])
+        if route == "rule_based":
+            logger.info("✓ Lead classified by rules (no LLM call)")
+            return rule_based_classification()
+        
+        cached = semantic_cache.lookup(lead['message'])
+        if cached:
+            logger.info(f"✓ Lead classified from semantic cache: {cached.get('category', 'Unknown')}")
+            return cached
+        
+        # Heavy / long messages get the bigger model
+        model = LLM_MODEL_BIG if route == "big_model" else self.model
         prompt = get_classification_prompt(lead)
-        response = self.call_llm(prompt)
+        classification = await self.call_llm_json(
+            prompt,
+            system=SYSTEM_CLASSIFY,
+            model=model,
+            temperature=CLASSIFY_TEMPERATURE,
+        )
         
-        if response:
-            classification = parse_json_response(response)
-            if classification:
-                logger.info(f"✓ Lead classified: {classification.get('category', 'Unknown')}")
-                return classification
+        if classification:
+            logger.info(f"✓ Lead classified: {classification.get('category', 'Unknown')}")
+            semantic_cache.store(lead['message'], classification)
+            return classification
         
         logger.warning("⚠ Using fallback classification")
         return {
@@ -122,16 +334,96 @@ class LeadQualificationAgent:
             "reasoning": "Automated classification failed",
         }
     
-    def generate_followup(self, lead, classification):
+    async def classify_batch(self, leads_chunk, model=None):
+        """Classify several leads in one LLM call; returns {lead_id: classification}"""
+        prompt = get_batch_classification_prompt(leads_chunk)
+        reply = await self.call_llm_json(
+            prompt,
+            system=SYSTEM_BATCH_CLASSIFY,
+            model=model,
+            temperature=CLASSIFY_TEMPERATURE,
+            max_tokens=BATCH_TOKENS_PER_LEAD * len(leads_chunk),
+        )
+        
+        classifications = {}
+        items = reply.get("leads") if reply else None
+        for item in items if isinstance(items, list) else []:
+            if isinstance(item, dict) and "lead_id" in item:
+                classifications[str(item.pop("lead_id"))] = item
+        
+        for lead in leads_chunk:
+            classification = classifications.get(str(lead["lead_id"]))
+            if classification:
+                semantic_cache.store(lead["message"], classification)
+        
+        logger.info(f"✓ Batch classified {len(classifications)}/{len(leads_chunk)} leads in one call")
+        return classifications
+    
+    async def classify_leads(self, leads):
+        """Classify all leads: rules, then semantic cache, then batched LLM calls"""
+        classifications = {}
+        by_model = {self.model: [], LLM_MODEL_BIG: []}
+        for lead in leads:
+            lead = fit_lead_message(lead)
+            route = route_request(lead["message"])
+            if route == "rule_based":
+                classifications[str(lead["lead_id"])] = rule_based_classification()
+                continue
+            
+            cached = semantic_cache.lookup(lead["message"])
+            if cached:
+                classifications[str(lead["lead_id"])] = cached
+            else:
+                model = LLM_MODEL_BIG if route == "big_model" else self.model
+                by_model[model].append(lead)
+        
+        batches = [
+            self.classify_batch(pending[i:i + CLASSIFY_BATCH_SIZE], model=model)
+            for model, pending in by_model.items()
+            for i in range(0, len(pending), CLASSIFY_BATCH_SIZE)
+        ]
+        for batch in await asyncio.gather(*batches):
+            classifications.update(batch)
+        
+        return classifications
+    
+    async def generate_followup(self, lead, classification):
+        lead = fit_lead_message(lead)
         prompt = get_followup_prompt(lead, classification)
-        response = self.call_llm(prompt)
+        response = await self.call_llm(prompt, system=SYSTEM_FOLLOWUP)
         return response if response else "Error: Could not generate email"
     
-    def process_lead(self, lead):
+    async def classify_and_draft(self, lead):
+        """
+        Classify one lead while speculatively drafting with a neutral classification:
+        1 round-trip instead of 2 when the real category turns out Hot/Warm.
+        """
+        classification, draft_email = await asyncio.gather(
+            self.classify_lead(lead),
+            self.generate_followup(lead, SPECULATIVE_CLASSIFICATION),
+        )
+        if classification["category"] in ("Hot", "Warm"):
+            self.speculation["hits"] += 1
+            return classification, draft_email
+        
+        self.speculation["misses"] += 1
+        return classification, None
+    
+    async def process_lead(self, lead, classification=None):
         logger.info(f"Processing lead: {lead['name']} ({lead['email']})")
         
-        classification = self.classify_lead(lead)
-        draft_email = self.generate_followup(lead, classification)
+        draft_email = None
+        # Leads missing from a batch reply fall back to a single-lead call
+        if classification is None:
+            # Speculate only when a Warm lead would be drafted anyway
+            if SPECULATIVE_DRAFTS and should_draft(SPECULATIVE_CLASSIFICATION["category"]):
+                classification, draft_email = await self.classify_and_draft(lead)
+            else:
+                classification = await self.classify_lead(lead)
+        
+        if should_draft(classification["category"]):
+            if draft_email is None:
+                draft_email = await self.generate_followup(lead, classification)
         
         return {
             "lead": lead,
@@ -142,7 +434,40 @@ class LeadQualificationAgent:
 # ----------------------------- 
 # Automated Processing
 # ----------------------------- 
-def auto_process_leads():
+async def process_leads_concurrently(agent, leads):
+    """Run the LLM stage for all leads concurrently; keeps input order"""
+    try:
+        classifications = await agent.classify_leads(leads)
+        tasks = [
+            agent.process_lead(lead, classifications.get(str(lead["lead_id"])))
+            for lead in leads
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # All drafts are written together, off the event loop
+        drafted = [r for r in results if not isinstance(r, Exception) and r["draft"] is not None]
+        saved = await asyncio.to_thread(save_drafts, [
+            (r["lead"]["lead_id"], r["lead"]["name"], r["draft"]) for r in drafted
+        ])
+        if len(saved) < len(drafted):
+            # Unsaved draft: skip that lead (no send, no state) so the next run retries it
+            failed = {r["lead"]["lead_id"] for r in drafted} - saved.keys()
+            results = [
+                r if isinstance(r, Exception) or r["lead"]["lead_id"] not in failed
+                else OSError(f"draft for lead {r['lead']['lead_id']} not saved")
+                for r in results
+            ]
+        
+        speculated = agent.speculation["hits"] + agent.speculation["misses"]
+        if speculated:
+            logger.info(f"Speculative drafts: {agent.speculation['hits']}/{speculated} used")
+        return results
+    finally:
+        # Release pooled connections before this event loop closes
+        await agent.client.close()
+
+
+async def auto_process_leads_async():
     """Process leads automatically with human-in-loop control"""
     global emails_sent_in_session
     
@@ -151,79 +476,83 @@ def auto_process_leads():
     logger.info(f"Human-in-loop: Stop after {EMAIL_BATCH_SIZE} emails")
     logger.info("=" * 70)
     
-    agent = LeadQualificationAgent()
     leads = load_leads()
     
-    if leads.empty:
+    if not leads:
         logger.warning("No leads found in leads.csv")
         return
     
-    state = load_state()
-    processed_ids = set(state["lead_id"].values) if not state.empty else set()
-    new_leads = leads[~leads["lead_id"].isin(processed_ids)]
+    processed_ids = get_state()  # dict keyed by lead_id: O(1) membership, no set copy
+    new_leads = [lead for lead in leads if lead["lead_id"] not in processed_ids]
     
-    if new_leads.empty:
+    if not new_leads:
         logger.info("All leads already processed")
         return
     
-    logger.info(f"Processing {len(new_leads)} new leads")
+    logger.info(f"Processing {len(new_leads)} new leads (concurrency: {LLM_CONCURRENCY})")
     
-    for idx, lead in new_leads.iterrows():
+    # Built only when there is work: process_leads_concurrently closes its client
+    agent = LeadQualificationAgent()
+    results = await process_leads_concurrently(agent, new_leads)
+    
+    # Decide every lead's outcome first, then send all approved emails in
+    # parallel; only as many as the human-in-loop batch still allows.
+    room = EMAIL_BATCH_SIZE - emails_sent_in_session
+    outcomes = []  # (lead, classification, status, index into jobs or None)
+    jobs = []
+    
+    for lead, result in zip(new_leads, results):
         try:
-            result = agent.process_lead(lead)
-            
-            # Save draft
-            save_draft(lead["lead_id"], lead["name"], result["draft"])
+            if isinstance(result, Exception):
+                raise result
             
             # Auto-send logic
             category = result["classification"]["category"]
-            send_email_flag = False
-            
-            if AUTO_SEND_EMAILS:
-                # Send based on threshold
-                if AUTO_APPROVE_THRESHOLD == "Hot" and category == "Hot":
-                    send_email_flag = True
-                elif AUTO_APPROVE_THRESHOLD == "Warm" and category in ["Hot", "Warm"]:
-                    send_email_flag = True
-                elif AUTO_APPROVE_THRESHOLD == "Cold":
-                    send_email_flag = True
+            send_email_flag = (
+                result["draft"] is not None
+                and AUTO_SEND_EMAILS
+                and category_passes(category)
+            )
             
             if send_email_flag:
+                if len(jobs) >= room:
+                    # Left out of state so the next run sends it
+                    logger.info(f"Lead {lead['lead_id']} deferred: batch limit reached")
+                    continue
                 subject, body = parse_email_content(result["draft"])
-                email_sent = send_email(
-                    to_email=lead["email"],
-                    subject=subject,
-                    body=body,
-                    lead_id=lead["lead_id"]
-                )
-                
-                if email_sent:
+                outcomes.append((lead, result["classification"], None, len(jobs)))
+                jobs.append({
+                    "to_email": lead["email"],
+                    "subject": subject,
+                    "body": body,
+                    "lead_id": lead["lead_id"],
+                })
+            elif result["draft"] is not None:
+                outcomes.append((lead, result["classification"], "approved", None))
+                logger.info(f"Draft saved only (category: {category}, threshold: {AUTO_APPROVE_THRESHOLD})")
+            else:
+                outcomes.append((lead, result["classification"], "classified", None))
+                logger.info(f"Classified only, no draft (category: {category}, threshold: {AUTO_APPROVE_THRESHOLD})")
+        
+        except Exception as e:
+            logger.error(f"Error processing lead {lead['lead_id']}: {e}", exc_info=True)
+    
+    sent = await asyncio.to_thread(send_emails_bulk, jobs)
+    now = datetime.now()  # one last_contact timestamp for the whole batch
+    
+    for lead, classification, status, job in outcomes:
+        try:
+            if job is not None:
+                status = "approved_sent" if sent[job] else "approved"
+                if sent[job]:
                     emails_sent_in_session += 1
                     logger.info(f"📧 Email sent ({emails_sent_in_session}/{EMAIL_BATCH_SIZE})")
-                    
-                    # Human-in-loop: Stop after batch size
-                    if emails_sent_in_session >= EMAIL_BATCH_SIZE:
-                        logger.info("=" * 70)
-                        logger.info(f"⏸️ BATCH LIMIT REACHED: {EMAIL_BATCH_SIZE} emails sent")
-                        logger.info("Pausing for human review. Restart to continue.")
-                        logger.info("=" * 70)
-                        update_lead_state(
-                            lead["lead_id"],
-                            status="approved_sent",
-                            next_action=result["classification"]["next_action"],
-                        )
-                        # Exit to require manual restart
-                        sys.exit(0)
-                
-                status = "approved_sent" if email_sent else "approved"
-            else:
-                status = "approved"
-                logger.info(f"Draft saved only (category: {category}, threshold: {AUTO_APPROVE_THRESHOLD})")
             
             update_lead_state(
                 lead["lead_id"],
                 status=status,
-                next_action=result["classification"]["next_action"],
+                next_action=classification["next_action"],
+                now=now,
             )
             
             logger.info(f"✅ Lead {lead['lead_id']} processed (status: {status})")
@@ -231,6 +560,18 @@ def auto_process_leads():
         except Exception as e:
             logger.error(f"Error processing lead {lead['lead_id']}: {e}", exc_info=True)
     
+    # Human-in-loop: Stop after batch size
+    if emails_sent_in_session >= EMAIL_BATCH_SIZE:
+        flush_state()
+        logger.info("=" * 70)
+        logger.info(f"⏸️ BATCH LIMIT REACHED: {EMAIL_BATCH_SIZE} emails sent")
+        logger.info("Pausing for human review. Restart to continue.")
+        logger.info("=" * 70)
+        # Exit to require manual restart
+        sys.exit(0)
+    
+    flush_state()
+    
     logger.info("=" * 70)
     logger.info("Automated processing complete")
     logger.info("=" * 70)
@@ -238,24 +579,43 @@ def auto_process_leads():
 # ----------------------------- 
 # Scheduler
 # ----------------------------- 
+def auto_process_leads():
+    """Run one automated processing pass (sync entry point)"""
+    asyncio.run(auto_process_leads_async())
+
+
+async def scheduler(interval=SCHEDULE_INTERVAL):
+    """Process leads now and then every `interval` seconds until SIGTERM/SIGINT"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: no loop signal handlers, Ctrl+C still raises
+    
+    while not stop.is_set():
+        await auto_process_leads_async()
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+    
+    logger.info("Shutdown requested - flushing state")
+    flush_state()
+
+
 def run_scheduled():
     """Run agent on schedule"""
     logger.info("Starting scheduled mode...")
     logger.info(f"Auto-send enabled: {AUTO_SEND_EMAILS}")
     logger.info(f"Auto-approve threshold: {AUTO_APPROVE_THRESHOLD}")
+    logger.info(f"Draft all leads: {DRAFT_ALL}")
     logger.info(f"Batch size (human-in-loop): {EMAIL_BATCH_SIZE}")
+    logger.info(f"Scheduler started - checking for new leads every {SCHEDULE_INTERVAL}s")
     
-    # Run immediately on startup
-    auto_process_leads()
-    
-    # Schedule for every hour
-    schedule.every(1).hours.do(auto_process_leads)
-    
-    logger.info("Scheduler started - checking for new leads every hour")
-    
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+    # Runs immediately on startup, then every interval
+    asyncio.run(scheduler())
 
 # ----------------------------- 
 # Entry point
@@ -6,18 +6,41 @@ load_dotenv()
 # API Configuration
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 LLM_MODEL = os.getenv('LLM_MODEL', 'llama-3.1-8b-instant')
+LLM_MODEL_BIG = os.getenv('LLM_MODEL_BIG', 'llama-3.3-70b-versatile')  # router: heavy leads
+
+# Groq HTTP connection pool (shared by concurrent requests)
+LLM_MAX_CONNECTIONS = 64
+LLM_MAX_KEEPALIVE = 32
+LLM_TIMEOUT = 30.0  # seconds
+LLM_CONNECT_TIMEOUT = 5.0  # seconds
 
 # Email Configuration
-EMAIL_SENDER = os.getenv('EMAIL_SENDER')  # Your Gmail address
-EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')  # Gmail App Password
-SMTP_SERVER = 'smtp.gmail.com'
-SMTP_PORT = 587
+RESEND_API_KEY = os.getenv('RESEND_API_KEY')  # emails are sent through the Resend API
+EMAIL_FROM = os.getenv('EMAIL_FROM', 'onboarding@resend.dev')  # Resend sender; the test sender works without a domain
+EMAIL_SEND_WORKERS = int(os.getenv('EMAIL_SEND_WORKERS', '5'))  # parallel Resend connections
 
 # File Paths
 LEADS_FILE = 'data/leads.csv'
 STATE_FILE = 'data/state.csv'
 OUTPUT_DIR = 'outputs/drafts'
+LLM_CACHE_FILE = 'outputs/llm_cache.sqlite'
+SEMANTIC_CACHE_FILE = 'outputs/semantic_cache.jsonl'
 
 # Agent Settings
 TEMPERATURE = 0.7
-MAX_TOKENS = 1000
\ No newline at end of file
+CLASSIFY_TEMPERATURE = 0.0  # deterministic classification -> reusable cache hits
+MAX_TOKENS = 1000
+LLM_CONTEXT_TOKENS = 131072  # Groq llama-3.x context window
+MAX_LEAD_MESSAGE_TOKENS = 2000  # longer lead messages are truncated before prompting
+CLASSIFY_BATCH_SIZE = int(os.getenv('CLASSIFY_BATCH_SIZE', '8'))  # leads per classification call
+BATCH_TOKENS_PER_LEAD = 250  # output budget per lead in a batch call
+STATE_FLUSH_EVERY = 10  # write state.csv after this many updates (and on exit)
+
+# LLM response cache
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+LLM_CACHE_TTL = 7 * 86400  # seconds
+
+# Semantic classification cache (needs sentence-transformers installed)
+SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'true').lower() == 'true'
+SEMANTIC_CACHE_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+SEMANTIC_CACHE_THRESHOLD = 0.92  # cosine similarity
\ No newline at end of file
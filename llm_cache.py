@@ -0,0 +1,57 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from config import LLM_CACHE_FILE, LLM_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+_conn = None
+
+
+def _get_conn():
+    """Open the cache database once per process"""
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(LLM_CACHE_FILE), exist_ok=True)
+        _conn = sqlite3.connect(LLM_CACHE_FILE)
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, content TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        _conn.commit()
+    return _conn
+
+
+def make_key(model, temperature, max_tokens, prompt, system=""):
+    """SHA-256 of everything that determines the LLM output"""
+    raw = f"{model}|{temperature}|{max_tokens}|{system}|{prompt}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def get_cached(key):
+    """Return cached response text, or None on miss/expiry"""
+    try:
+        row = _get_conn().execute(
+            "SELECT content, expires_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+    except sqlite3.Error as e:
+        logger.warning("⚠ Warning: LLM cache read failed: %s", e)
+        return None
+
+    if row is None or row[1] < time.time():
+        return None
+    return row[0]
+
+
+def set_cached(key, content, expire=LLM_CACHE_TTL):
+    """Store response text for `expire` seconds"""
+    try:
+        conn = _get_conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, content, expires_at) VALUES (?, ?, ?)",
+            (key, content, time.time() + expire),
+        )
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.warning("⚠ Warning: LLM cache write failed: %s", e)
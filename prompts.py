@@ -1,67 +1,68 @@
-def get_classification_prompt(lead):
-    """Generate classification prompt for LLM"""
-    
-    return f"""You are a sales assistant analyzing incoming leads.
+# Static instructions live in the system message: identical on every call
+# (prefix-cacheable), so the per-lead user message only carries lead data.
 
-Lead Information:
-- Name: {lead['name']}
-- Email: {lead['email']}
-- Message: {lead['message']}
-- Source: {lead['source']}
+_CLASSIFY_RULES = """Classify sales leads.
+category: Hot (clear intent, budget, urgent) / Warm (interested, needs nurturing) / Cold (generic, low intent)
+intent: what they actually want
+urgency: Immediate / This Week / This Month / Unknown
+concerns: objections or blockers mentioned
+next_action: what we should do next
+reasoning: why you classified this way"""
 
-Analyze and classify this lead:
+# Used with Groq JSON mode (response_format json_object), which guarantees
+# parseable output - the key list above is all the schema the model needs
+SYSTEM_CLASSIFY = f"""{_CLASSIFY_RULES}
 
-1. Category: Hot/Warm/Cold
-   - Hot: Clear intent, budget indicators, urgent timeline
-   - Warm: Interested but needs nurturing
-   - Cold: Generic inquiry, low intent
+Reply with a JSON object with exactly these keys (concerns is a list)."""
 
-2. Intent: What do they actually want?
+SYSTEM_BATCH_CLASSIFY = f"""{_CLASSIFY_RULES}
 
-3. Urgency: Immediate / This Week / This Month / Unknown
+Classify each lead independently. Reply with a JSON object {{"leads": [...]}}: one object per lead, same order, each with lead_id plus the keys above (concerns is a list)."""
 
-4. Key Concerns: Any objections or blockers mentioned?
+# Appended to the system message when a JSON reply failed to parse
+STRICT_JSON_SUFFIX = "\n\nIMPORTANT: output one valid JSON object and nothing else."
 
-5. Next Best Action: What should we do next?
+SYSTEM_FOLLOWUP = """You write sales follow-up emails for Bishwajit Singh.
+- Address the lead's specific inquiry directly
+- Build credibility: "I build production-grade AI systems (medical imaging, clinical-grade pipelines)"
+- Suggest a clear next step based on urgency
+- Professional, warm, human tone; 3-4 short paragraphs
 
-Respond ONLY in this JSON format (no other text):
-{{
-  "category": "Hot/Warm/Cold",
-  "intent": "brief description",
-  "urgency": "timeline",
-  "concerns": ["list", "of", "concerns"],
-  "next_action": "suggested action",
-  "reasoning": "why you classified this way"
-}}"""
+Reply with ONLY the email in this format:
+Subject: <compelling subject line>
 
+Dear <lead name>,
 
-def get_followup_prompt(lead, classification):
-    """Generate follow-up email prompt"""
-    
-    return f"""You are a professional sales assistant writing a follow-up email.
+<body>
 
-Lead Details:
-- Name: {lead['name']}
-- Their Message: {lead['message']}
-- Classification: {classification['category']}
-- Intent: {classification['intent']}
-- Urgency: {classification['urgency']}
+Best regards,
+Bishwajit Singh"""
 
-Write a personalized follow-up email that:
-1. Addresses their specific inquiry directly
-2. Builds credibility: "I build production-grade AI systems (medical imaging, clinical-grade pipelines)"
-3. Suggests a clear next step based on urgency
-4. Professional but warm and human tone
-5. Keep it concise: 3-4 short paragraphs
 
-Format your response as:
-Subject: [compelling subject line]
+def get_classification_prompt(lead):
+    """Generate classification prompt for LLM (use with SYSTEM_CLASSIFY)"""
 
-Dear {lead['name']},
+    return f"""Name: {lead['name']}
+Email: {lead['email']}
+Message: {lead['message']}
+Source: {lead['source']}"""
 
-[Email body - be specific to their message]
 
-Best regards,
-Bishwajit Singh
+def get_followup_prompt(lead, classification):
+    """Generate follow-up email prompt (use with SYSTEM_FOLLOWUP)"""
+
+    return f"""Name: {lead['name']}
+Message: {lead['message']}
+Classification: {classification['category']}
+Intent: {classification['intent']}
+Urgency: {classification['urgency']}"""
+
+
+def get_batch_classification_prompt(leads_chunk):
+    """Generate one classification prompt for several leads (use with SYSTEM_BATCH_CLASSIFY)"""
 
-Respond with ONLY the email (subject + body), no other text."""
\ No newline at end of file
+    return "\n".join(
+        f"lead_id: {lead['lead_id']} | Name: {lead['name']} | Email: {lead['email']} "
+        f"| Source: {lead['source']} | Message: {lead['message']}"
+        for lead in leads_chunk
+    )
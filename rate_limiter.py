@@ -0,0 +1,81 @@
+import asyncio
+import re
+import time
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value):
+    """Parse Groq reset durations like '7.66s', '2m59.56s' or '500ms' into seconds"""
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    return sum(float(n) * _UNIT_SECONDS[unit] for n, unit in _DURATION_RE.findall(value))
+
+
+def retry_after_seconds(headers):
+    """Seconds to wait from a 429 response, or None if the headers don't say"""
+    if not headers:
+        return None
+    if headers.get("retry-after"):
+        return parse_duration(headers["retry-after"])
+    resets = [
+        parse_duration(headers.get(h))
+        for h in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+        if headers.get(h)
+    ]
+    return max(resets) if resets else None
+
+
+class RateLimiter:
+    """
+    Process-wide view of the Groq quota, seeded from x-ratelimit-* headers.
+    Each call takes one request from the bucket; when requests or tokens are
+    (nearly) exhausted, callers wait until the window resets instead of
+    firing requests that will come back as 429s.
+    """
+
+    def __init__(self, min_tokens=1000):
+        self.min_tokens = min_tokens
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def update(self, headers):
+        """Refresh the bucket from a response's rate-limit headers"""
+        now = time.monotonic()
+        if headers.get("x-ratelimit-remaining-requests") is not None:
+            self.remaining_requests = int(headers["x-ratelimit-remaining-requests"])
+            self.requests_reset_at = now + parse_duration(headers.get("x-ratelimit-reset-requests"))
+        if headers.get("x-ratelimit-remaining-tokens") is not None:
+            self.remaining_tokens = int(headers["x-ratelimit-remaining-tokens"])
+            self.tokens_reset_at = now + parse_duration(headers.get("x-ratelimit-reset-tokens"))
+
+    def block_for(self, seconds):
+        """Hold all callers for `seconds` (after a 429 with retry-after)"""
+        self.remaining_requests = 0
+        self.requests_reset_at = max(self.requests_reset_at, time.monotonic() + seconds)
+
+    async def acquire(self):
+        """Wait until the quota allows another request, then take it"""
+        async with self.lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.remaining_requests is not None and self.remaining_requests <= 0:
+                wait = max(wait, self.requests_reset_at - now)
+            if self.remaining_tokens is not None and self.remaining_tokens < self.min_tokens:
+                wait = max(wait, self.tokens_reset_at - now)
+
+            if wait > 0:
+                await asyncio.sleep(wait)
+                # Window has reset; headers of the next response re-seed the bucket
+                self.remaining_requests = None
+                self.remaining_tokens = None
+            elif self.remaining_requests is not None:
+                self.remaining_requests -= 1
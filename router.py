@@ -1,32 +1,82 @@
 # router.py
+import re
+
+# Messages longer than this always get the big model
+LONG_MESSAGE_CHARS = 600
+# Greetings / thanks only short-circuit when the message is this short
+TRIVIAL_MAX_WORDS = 6
+
+# buying signals → never skip the LLM
+BUYING_PATTERNS = [
+    "price",
+    "pricing",
+    "cost",
+    "quote",
+    "budget",
+    "demo",
+    "trial",
+    "urgent",
+    "proposal"
+]
+
+TRIVIAL_PATTERNS = [
+    "hi",
+    "hello",
+    "thanks",
+    "thank you",
+    "bye"
+]
+
+HEAVY_PATTERNS = [
+    "analyze",
+    "compare",
+    "research",
+    "plan",
+    "strategy",
+    "summarize document"
+]
+
+
+def _compile(patterns, whole_word):
+    """One alternation regex per pattern set, compiled once at import"""
+    alternation = "|".join(map(re.escape, patterns))
+    suffix = r"\b" if whole_word else ""
+    return re.compile(rf"\b(?:{alternation}){suffix}", re.IGNORECASE)
+
+
+# Greetings must match whole words ("hi" must not match "this");
+# buying/heavy stems also match inflections ("pricing", "planning")
+_BUYING_RE = _compile(BUYING_PATTERNS, whole_word=False)
+_TRIVIAL_RE = _compile(TRIVIAL_PATTERNS, whole_word=True)
+_HEAVY_RE = _compile(HEAVY_PATTERNS, whole_word=False)
+
 
 def route_request(user_message: str) -> str:
-    msg = user_message.lower()
+    msg = str(user_message)
 
     # 1. rule based → avoid LLM
-    trivial_patterns = [
-        "hi",
-        "hello",
-        "thanks",
-        "thank you",
-        "bye"
-    ]
-
-    if any(p in msg for p in trivial_patterns):
+    if (
+        len(msg.split()) <= TRIVIAL_MAX_WORDS
+        and _TRIVIAL_RE.search(msg)
+        and not _BUYING_RE.search(msg)
+    ):
         return "rule_based"
 
     # 2. heavy reasoning → big model
-    heavy_patterns = [
-        "analyze",
-        "compare",
-        "research",
-        "plan",
-        "strategy",
-        "summarize document"
-    ]
-
-    if any(p in msg for p in heavy_patterns):
+    if len(msg) > LONG_MESSAGE_CHARS or _HEAVY_RE.search(msg):
         return "big_model"
 
     # 3. default → small model
     return "small_model"
+
+
+def rule_based_classification():
+    """Canned classification for greetings / thanks (no LLM call)"""
+    return {
+        "category": "Cold",
+        "intent": "greeting",
+        "urgency": "Unknown",
+        "concerns": [],
+        "next_action": "no_action",
+        "reasoning": "Rule-based: short greeting with no buying signal",
+    }
@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+from config import (
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_FILE,
+    SEMANTIC_CACHE_MODEL,
+    SEMANTIC_CACHE_THRESHOLD,
+)
+
+# Optional dependency: without sentence-transformers the cache is a no-op
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    AVAILABLE = SEMANTIC_CACHE_ENABLED
+except ImportError:
+    AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+_model = None
+_embeddings = None  # (n, dim) float32, L2-normalised -> dot product == cosine
+_classifications = []
+_failed = False  # model or cache file failed to load: stay disabled for this process
+
+
+def _load():
+    """Load the embedding model and persisted entries once; False if unavailable"""
+    global _model, _embeddings, _classifications, _failed
+    if _model is not None:
+        return True
+    if _failed:
+        return False
+
+    try:
+        model = SentenceTransformer(SEMANTIC_CACHE_MODEL, device='cpu')
+        vectors, classifications = [], []
+        if os.path.exists(SEMANTIC_CACHE_FILE):
+            with open(SEMANTIC_CACHE_FILE, encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    vectors.append(entry['embedding'])
+                    classifications.append(entry['classification'])
+
+        dim = model.get_sentence_embedding_dimension()
+        embeddings = np.asarray(vectors, dtype=np.float32).reshape(-1, dim)
+    except Exception as e:
+        _failed = True
+        logger.warning("⚠ Warning: Semantic cache disabled: %s", e)
+        return False
+
+    _model, _embeddings, _classifications = model, embeddings, classifications
+    logger.info("✓ Semantic cache loaded (%d entries)", len(_classifications))
+    return True
+
+
+def _embed(message):
+    return _model.encode(str(message), normalize_embeddings=True).astype(np.float32)
+
+
+def lookup(message):
+    """Return a cached classification for a semantically similar message, or None"""
+    if not AVAILABLE:
+        return None
+    try:
+        if not _load() or not _classifications:
+            return None
+
+        scores = _embeddings @ _embed(message)
+        best = int(np.argmax(scores))
+        if scores[best] >= SEMANTIC_CACHE_THRESHOLD:
+            return dict(_classifications[best])
+    except Exception as e:
+        logger.warning("⚠ Warning: Semantic cache lookup failed: %s", e)
+    return None
+
+
+def store(message, classification):
+    """Add a message -> classification pair and append it to the cache file"""
+    global _embeddings
+    if not AVAILABLE:
+        return
+    try:
+        if not _load():
+            return
+        vector = _embed(message)
+        _embeddings = np.vstack([_embeddings, vector])
+        _classifications.append(classification)
+
+        os.makedirs(os.path.dirname(SEMANTIC_CACHE_FILE), exist_ok=True)
+        with open(SEMANTIC_CACHE_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'embedding': vector.tolist(),
+                                'classification': classification}) + '\n')
+    except Exception as e:
+        logger.warning("⚠ Warning: Semantic cache update failed: %s", e)
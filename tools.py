@@ -1,138 +1,466 @@
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+import atexit
+import csv
+import functools
 import json
+import logging
+from dataclasses import dataclass
 from datetime import datetime
+import operator
 import os
-import resend
-from config import LEADS_FILE, STATE_FILE, OUTPUT_DIR, EMAIL_SENDER, EMAIL_PASSWORD, SMTP_SERVER, SMTP_PORT
+import string
+import threading
+from pathlib import Path
+from config import LEADS_FILE, STATE_FILE, STATE_FLUSH_EVERY, OUTPUT_DIR, MAX_LEAD_MESSAGE_TOKENS, RESEND_API_KEY, EMAIL_FROM, EMAIL_SEND_WORKERS
+
+# Optional dependency: orjson for faster JSON decoding
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Handlers are configured by the agent entry points
+logger = logging.getLogger(__name__)
 
 
 def load_leads():
-    """Load leads from CSV"""
+    """Load leads from CSV as a list of dicts (all values are strings)"""
     try:
-        df = pd.read_csv(LEADS_FILE)
-        print(f"✓ Loaded {len(df)} leads from {LEADS_FILE}")
-        return df
+        with open(LEADS_FILE, newline='', encoding='utf-8-sig') as f:
+            leads = list(csv.DictReader(f))
+        logger.info("✓ Loaded %d leads from %s", len(leads), LEADS_FILE)
+        return leads
     except FileNotFoundError:
-        print(f"✗ Error: {LEADS_FILE} not found")
-        return pd.DataFrame()
+        logger.error("✗ Error: %s not found", LEADS_FILE)
+        return []
     except Exception as e:
-        print(f"✗ Error loading leads: {e}")
-        return pd.DataFrame()
+        logger.error("✗ Error loading leads: %s", e)
+        return []
+
+
+STATE_COLUMNS = ['lead_id', 'status', 'follow_up_count', 'last_contact', 'next_action']
+
+
+@dataclass(slots=True)
+class LeadState:
+    """One row of the state file"""
+    lead_id: str
+    status: str
+    follow_up_count: int
+    last_contact: datetime
+    next_action: str
+
+    @classmethod
+    def from_row(cls, row):
+        try:
+            last_contact = datetime.fromisoformat(row['last_contact'])
+        except (TypeError, ValueError):
+            last_contact = row['last_contact']
+        return cls(
+            lead_id=row['lead_id'],
+            status=row['status'],
+            follow_up_count=int(row['follow_up_count'] or 0),
+            last_contact=last_contact,
+            next_action=row['next_action'],
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def path_exists(path):
+    """Cached existence check; call path_exists.cache_clear() after creating paths"""
+    return Path(path).exists()
+
+
+# Buffer size for state CSV writes
+_WRITE_BUFFER = 1 << 20
+
+# LeadState -> CSV row tuple in STATE_COLUMNS order
+_state_row = operator.attrgetter(*STATE_COLUMNS)
 
 
+def _write_state_rows(rows, mode='w'):
+    """Write LeadState rows to STATE_FILE (header only when rewriting)"""
+    with open(STATE_FILE, mode, newline='', encoding='utf-8', buffering=_WRITE_BUFFER) as f:
+        writer = csv.writer(f, lineterminator='\n')
+        if mode == 'w':
+            writer.writerow(STATE_COLUMNS)
+        writer.writerows(map(_state_row, rows))
+
+
+@functools.lru_cache(maxsize=1)
 def load_state():
-    """Load lead state tracking"""
+    """Load lead state tracking as a list of LeadState (memoized; cleared by StateStore.flush)"""
     try:
-        if os.path.exists(STATE_FILE) and os.path.getsize(STATE_FILE) > 0:
-            return pd.read_csv(STATE_FILE)
+        try:
+            size = os.stat(STATE_FILE).st_size
+        except FileNotFoundError:
+            size = 0
+        
+        if size > 0:
+            with open(STATE_FILE, newline='', encoding='utf-8-sig') as f:
+                return [LeadState.from_row(row) for row in csv.DictReader(f)]
         else:
             # Create new state file
-            df = pd.DataFrame(columns=['lead_id', 'status', 'follow_up_count', 
-                                      'last_contact', 'next_action'])
-            df.to_csv(STATE_FILE, index=False)
-            return df
+            _write_state_rows([])
+            return []
     except Exception as e:
-        print(f"⚠ Warning: Could not load state file: {e}")
-        return pd.DataFrame(columns=['lead_id', 'status', 'follow_up_count', 
-                                    'last_contact', 'next_action'])
+        logger.warning("⚠ Warning: Could not load state file: %s", e)
+        return []
 
 
-def update_lead_state(lead_id, status, next_action):
-    """Update lead state after processing"""
-    state = load_state()
-    
-    # Check if lead exists in state
-    if lead_id in state['lead_id'].values:
-        # Update existing
-        state.loc[state['lead_id'] == lead_id, 'status'] = status
-        state.loc[state['lead_id'] == lead_id, 'follow_up_count'] += 1
-        state.loc[state['lead_id'] == lead_id, 'last_contact'] = datetime.now()
-        state.loc[state['lead_id'] == lead_id, 'next_action'] = next_action
-    else:
-        # Add new
-        new_row = pd.DataFrame([{
-            'lead_id': lead_id,
-            'status': status,
-            'follow_up_count': 1,
-            'last_contact': datetime.now(),
-            'next_action': next_action
-        }])
-        state = pd.concat([state, new_row], ignore_index=True)
+def _ends_with_newline(path):
+    """True if the file exists and a row can be appended to it safely"""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+    except OSError:
+        return False
+
+
+class StateStore:
+    """In-memory lead state {lead_id: LeadState}, flushed every `flush_every` updates and on exit"""
+
+    def __init__(self, flush_every=STATE_FLUSH_EVERY):
+        self.flush_every = flush_every
+        self.rows = None
+        self.pending = 0
+        self.new_ids = {}  # leads added since the last flush (dict: ordered, O(1) membership)
+        self.rewrite = False  # an already-written row changed
+        # Re-entrant: update() calls load() while holding the lock
+        self.lock = threading.RLock()
+
+    def load(self):
+        with self.lock:
+            if self.rows is None:
+                self.rows = {row.lead_id: row for row in load_state()}
+            return self.rows
+
+    def update(self, lead_id, status, next_action, now=None):
+        with self.lock:
+            self._update(str(lead_id), status, next_action, now or datetime.now())
+
+    def _update(self, lead_id, status, next_action, now):
+        rows = self.load()
+        row = rows.get(lead_id)
+
+        if row is not None:
+            # Update existing
+            row.status = status
+            row.follow_up_count += 1
+            row.last_contact = now
+            row.next_action = next_action
+            if lead_id not in self.new_ids:
+                self.rewrite = True
+        else:
+            # Add new
+            rows[lead_id] = LeadState(
+                lead_id=lead_id,
+                status=status,
+                follow_up_count=1,
+                last_contact=now,
+                next_action=next_action,
+            )
+            self.new_ids[lead_id] = None
+
+        self.pending += 1
+        if self.pending >= self.flush_every:
+            self._flush()
+
+    def flush(self):
+        """Write state to STATE_FILE if there are unsaved updates"""
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+
+        if self.rewrite or not _ends_with_newline(STATE_FILE):
+            _write_state_rows(self.rows.values())
+        else:
+            # Only new leads: append their rows instead of rewriting the file
+            _write_state_rows((self.rows[i] for i in self.new_ids), mode='a')
+
+        self.pending = 0
+        self.new_ids = {}
+        self.rewrite = False
+        load_state.cache_clear()
+
+
+state_store = StateStore()
+atexit.register(state_store.flush)
+
+
+def update_lead_state(lead_id, status, next_action, *, now=None):
+    """Update lead state after processing (now: timestamp to record, default current time)"""
+    state_store.update(lead_id, status, next_action, now)
+    logger.debug("✓ State updated for lead %s", lead_id)
+
+
+def get_state():
+    """Current in-memory state: {lead_id: LeadState} (loaded once per process)"""
+    return state_store.load()
+
+
+def flush_state():
+    """Persist pending state updates (call at the end of a batch)"""
+    state_store.flush()
+
+
+def estimate_tokens(text):
+    """Fast token estimate (~4 characters per token for English text)"""
+    return len(text) // 4
+
+
+def fit_lead_message(lead, max_tokens=MAX_LEAD_MESSAGE_TOKENS):
+    """Return the lead with its message truncated to max_tokens (estimated)"""
+    message = str(lead['message'])
+    if estimate_tokens(message) <= max_tokens:
+        return lead
     
-    state.to_csv(STATE_FILE, index=False)
-    print(f"✓ State updated for lead {lead_id}")
+    logger.warning("⚠ Warning: Message for lead %s truncated to ~%d tokens", lead['lead_id'], max_tokens)
+    lead = dict(lead)
+    lead['message'] = message[:max_tokens * 4]
+    return lead
+
+
+# Spaces and path separators -> underscores, ASCII A-Z -> a-z
+_FILENAME_TABLE = str.maketrans(
+    {' ': '_', '/': '_', '\\': '_', **{c: c.lower() for c in string.ascii_uppercase}}
+)
+
+
+def _draft_filename(lead_id, lead_name):
+    name = str(lead_name).translate(_FILENAME_TABLE)
+    if not name.isascii():
+        name = name.lower()
+    return os.path.join(OUTPUT_DIR, f"lead_{lead_id}_{name}.txt")
+
+
+# Binary mode on Windows (no LF -> CRLF translation)
+_O_BINARY = getattr(os, 'O_BINARY', 0)
+
+
+def _write_draft(filename, draft_email):
+    """Atomic write via a raw fd: temp file + os.replace"""
+    tmp_filename = f"{filename}.tmp"
+    data = memoryview(draft_email.encode('utf-8'))
+    fd = os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | _O_BINARY, 0o644)
+    try:
+        try:
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
+        os.replace(tmp_filename, filename)
+    except OSError:
+        # Don't leave a partial temp file behind
+        try:
+            os.remove(tmp_filename)
+        except OSError:
+            pass
+        raise
 
 
 def save_draft(lead_id, lead_name, draft_email):
     """Save approved email draft"""
-    filename = f"{OUTPUT_DIR}/lead_{lead_id}_{lead_name.replace(' ', '_').lower()}.txt"
-    
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(draft_email)
+    filename = _draft_filename(lead_id, lead_name)
+    _write_draft(filename, draft_email)
     
-    print(f"✓ Draft saved: {filename}")
+    logger.debug("✓ Draft saved: %s", filename)
     return filename
 
 
+def save_drafts(drafts):
+    """
+    Save a batch of drafts in one pass
+    drafts: iterable of (lead_id, lead_name, draft_email)
+    Returns: {lead_id: filename} for the drafts that were written
+    """
+    saved = {}
+    for lead_id, lead_name, draft_email in drafts:
+        filename = _draft_filename(lead_id, lead_name)
+        try:
+            _write_draft(filename, draft_email)
+        except OSError as e:
+            logger.error("✗ Could not save draft for lead %s: %s", lead_id, e)
+            continue
+        saved[lead_id] = filename
+    
+    if saved:
+        logger.info("✓ %d drafts saved to %s", len(saved), OUTPUT_DIR)
+    return saved
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
 def parse_json_response(response_text):
-    """Safely parse LLM JSON response"""
+    """Safely parse LLM JSON response (str or raw bytes)"""
+    try:
+        # JSON-mode replies are pure JSON: decode directly
+        return _json_loads(response_text)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        pass
+    
     try:
-        # Try to extract JSON from response
-        start = response_text.find('{')
-        end = response_text.rfind('}') + 1
+        # Free-form reply: decode the first object, ignoring any text after it
+        start = response_text.find(b'{' if isinstance(response_text, bytes) else '{')
         
-        if start != -1 and end > start:
-            json_str = response_text[start:end]
-            return json.loads(json_str)
+        if start != -1:
+            if isinstance(response_text, bytes):
+                response_text, start = response_text[start:].decode('utf-8'), 0
+            return _JSON_DECODER.raw_decode(response_text, start)[0]
         else:
-            print("⚠ Warning: No JSON found in response")
+            logger.warning("⚠ Warning: No JSON found in response")
             return None
-    except json.JSONDecodeError as e:
-        print(f"⚠ Warning: Could not parse JSON: {e}")
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        logger.warning("⚠ Warning: Could not parse JSON: %s", e)
         return None
 
-resend.api_key = os.getenv("RESEND_API_KEY")
+
+def is_json_object(response_text):
+    """True if the text is exactly one JSON object (what Groq JSON mode returns)"""
+    try:
+        return isinstance(_json_loads(response_text), dict)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return False
+
+
+def is_json_validate_failed(error):
+    """True if a Groq 400 means JSON mode rejected the model's output (json_validate_failed)"""
+    body = getattr(error, 'body', None)
+    if isinstance(body, dict):
+        body = body.get('error', body)
+    return isinstance(body, dict) and body.get('code') == 'json_validate_failed'
+
+
+class EmailSession:
+    """Resend HTTP client (request() interface) with one keep-alive requests.Session per thread"""
+
+    def __init__(self, timeout=30):
+        self._timeout = timeout
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return this thread's live requests.Session, opening it on first use"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            import requests
+            session = self._local.session = requests.Session()
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def request(self, method, url, headers, json=None, files=None, data=None):
+        import requests
+        kwargs = {'files': files} if files is not None else {'json': json if data is None else None}
+        try:
+            resp = self.get().request(method=method, url=url, headers=headers,
+                                      data=data, timeout=self._timeout, **kwargs)
+            return resp.content, resp.status_code, resp.headers
+        except requests.RequestException as e:
+            # Resend wraps this into a ResendError, same as its default client
+            raise RuntimeError(f"Request failed: {e}") from e
+
+    def close(self):
+        """Close every thread's session"""
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
+
+
+_EMAIL_ENABLED = bool(RESEND_API_KEY)
+
+email_session = EmailSession()
+atexit.register(email_session.close)
+_resend = None
+
+
+def _get_resend():
+    """Import and configure the Resend SDK on first use"""
+    global _resend
+    if _resend is None:
+        import resend
+        resend.api_key = RESEND_API_KEY
+        resend.default_http_client = email_session
+        _resend = resend
+    return _resend
 
 def send_email(to_email, subject, body, lead_id):
     """
     Send email via Resend API
     Returns: True if sent successfully, False otherwise
     """
+    if not _EMAIL_ENABLED:
+        logger.error("❌ Email not configured (RESEND_API_KEY missing), not sent to %s", to_email)
+        return False
+    
     try:
-        response = resend.Emails.send({
-            "from": "onboarding@resend.dev",  # test sender (works without domain)
+        response = _get_resend().Emails.send({
+            "from": EMAIL_FROM,
             "to": [to_email],
             "subject": subject,
             "text": body,
         })
 
-        print(f"✅ Email sent to {to_email} (Lead {lead_id})")
-        print(f"Resend ID: {response.get('id')}")
+        logger.info("✅ Email sent to %s (Lead %s)", to_email, lead_id)
+        logger.debug("Resend ID: %s", response.get('id'))
         return True
 
     except Exception as e:
-        print(f"❌ Failed to send email: {e}")
+        logger.error("❌ Failed to send email: %s", e)
         return False
 
 
+_email_pool = None
+_email_pool_lock = threading.Lock()
+
+
+def _get_email_pool():
+    """Process-wide send pool: its threads (and their sessions) live across runs"""
+    global _email_pool
+    with _email_pool_lock:
+        if _email_pool is None:
+            _email_pool = ThreadPoolExecutor(max_workers=EMAIL_SEND_WORKERS, thread_name_prefix='email')
+            atexit.register(_email_pool.shutdown)
+        return _email_pool
+
+
+def send_emails_bulk(jobs):
+    """
+    Send several emails in parallel, one persistent connection per worker
+    jobs: list of dicts with send_email's keyword arguments
+    Returns: list of True/False, in the same order as jobs
+    """
+    if not jobs:
+        return []
+    return list(_get_email_pool().map(lambda job: send_email(**job), jobs))
+
+
+@functools.lru_cache(maxsize=1024)
 def parse_email_content(draft_email):
     """
     Extract subject and body from generated email
-    Returns: (subject, body) tuple
+    Returns: (subject, body) tuple (memoized: pure function of the text)
     """
-    lines = draft_email.strip().split('\n')
-    
-    subject = "Follow-up on your inquiry"  # Default
-    body_lines = []
+    text = draft_email.strip()
+    # SYSTEM_FOLLOWUP puts "Subject: ..." on the first line
+    first, _, rest = text.partition('\n')
     
-    found_subject = False
-    for line in lines:
-        if line.startswith('Subject:'):
-            subject = line.replace('Subject:', '').strip()
-            found_subject = True
-        elif found_subject or not line.startswith('Subject:'):
-            body_lines.append(line)
+    if first.startswith('Subject:'):
+        return first[len('Subject:'):].strip(), rest.strip()
     
-    body = '\n'.join(body_lines).strip()
+    # Preamble before the subject ("Here is the email:"): drop only the subject line
+    start = text.find('\nSubject:')
+    if start != -1:
+        line, _, rest = text[start + 1:].partition('\n')
+        return line[len('Subject:'):].strip(), f"{text[:start]}\n{rest}".strip()
     
-    return subject, body
\ No newline at end of file
+    return "Follow-up on your inquiry", text